@@ -0,0 +1,246 @@
+from __future__ import annotations
+import json
+import math
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from pathlib import Path
+from typing import Literal, get_args
+import pandas as pd
+
+# query-validated names; keep CohortPeriod in sync with PERIODS below
+CohortMetric = Literal["sleep_hours", "steps", "active_minutes", "calories", "sugar_g", "resting_hr"]
+CohortPeriod = Literal["7d", "30d"]
+
+COHORT_METRICS: list[str] = list(get_args(CohortMetric))
+
+# period label -> trailing days used for a user's summary value
+PERIODS: dict[str, int] = {"7d": 7, "30d": 30}
+
+# cohort name -> columns whose (latest) values define a user's cohort; () means everyone
+DEFAULT_COHORTS: dict[str, tuple[str, ...]] = {"all": ()}
+
+# JSON object of cohort name -> list of grouping columns; override with WELLNESS_COHORTS_PATH
+COHORTS_CONFIG_PATH = Path(__file__).resolve().parent.parent / "data" / "cohorts.json"
+
+MIN_COHORT_SIZE = 5
+
+
+def load_cohort_config(path: str | Path | None = None) -> dict[str, tuple[str, ...]]:
+    """Read cohort definitions, falling back to DEFAULT_COHORTS when no file exists."""
+    path = Path(path or os.environ.get("WELLNESS_COHORTS_PATH") or COHORTS_CONFIG_PATH)
+    if not path.exists():
+        return dict(DEFAULT_COHORTS)
+
+    raw = json.loads(path.read_text())
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError(f"{path}: expected a non-empty object of cohort name -> column list")
+    cohorts: dict[str, tuple[str, ...]] = {}
+    for name, cols in raw.items():
+        if not isinstance(cols, list) or not all(isinstance(c, str) for c in cols):
+            raise ValueError(f"{path}: cohort {name!r} must map to a list of column names")
+        cohorts[str(name)] = tuple(cols)
+    return cohorts
+
+
+class _Distribution:
+    """Sorted per-user values plus running moments for one cohort/metric/period."""
+
+    def __init__(self) -> None:
+        self.values: list[float] = []
+        self.by_user: dict[str, float] = {}
+        # moments are kept around a shift (the first value seen) so near-equal
+        # values don't cancel catastrophically in sum(x^2) - n * mean^2
+        self.shift = 0.0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._updates = 0
+
+    def remove(self, user_id: str) -> None:
+        v = self.by_user.pop(user_id, None)
+        if v is None:
+            return
+        del self.values[bisect_left(self.values, v)]
+        if not self.values:
+            # reset instead of subtracting so drift can't outlive the members
+            self.total = self.total_sq = 0.0
+            return
+        d = v - self.shift
+        self.total -= d
+        self.total_sq -= d * d
+
+    def put(self, user_id: str, v: float) -> None:
+        self.remove(user_id)
+        if not self.values:
+            self.shift = v
+        self.by_user[user_id] = v
+        insort(self.values, v)
+        d = v - self.shift
+        self.total += d
+        self.total_sq += d * d
+        self._updates += 1
+        if self._updates > 2 * len(self.values) + 16:
+            self._resum()
+
+    def _resum(self) -> None:
+        # amortized O(1): re-center on the median and recompute exactly to shed drift
+        self.shift = self.values[len(self.values) // 2]
+        self.total = math.fsum(x - self.shift for x in self.values)
+        self.total_sq = math.fsum((x - self.shift) ** 2 for x in self.values)
+        self._updates = 0
+
+    def rank(self, v: float) -> dict:
+        n = len(self.values)
+        # mid-rank percentile: ties count half, so the median user sits at 50
+        lo = bisect_left(self.values, v)
+        hi = bisect_right(self.values, v)
+        pct = (lo + hi) / 2 / n * 100 if n else None
+
+        z = None
+        if n > 1:
+            mean_d = self.total / n
+            mean = self.shift + mean_d
+            var = max(self.total_sq - n * mean_d * mean_d, 0.0) / (n - 1)
+            # anything this small relative to the shifted moments is rounding noise, not spread
+            if var > 1e-12 * max(self.total_sq / n, 0.0):
+                z = (v - mean) / math.sqrt(var)
+        return {"percentile": pct, "z": z, "cohort_size": n}
+
+
+class CohortIndex:
+    """
+    Per-cohort, per-metric, per-period distributions of users' trailing means.
+
+    `ingest()` runs once per ingested batch and only touches the users in it;
+    `lookup()` ranks a value with a binary search, so dashboards never scan
+    the whole population.
+    """
+
+    def __init__(
+        self,
+        cohorts: dict[str, tuple[str, ...]] | None = None,
+        metrics: list[str] | None = None,
+        periods: dict[str, int] | None = None,
+    ) -> None:
+        self.cohorts = dict(cohorts or DEFAULT_COHORTS)
+        self.metrics = list(metrics or COHORT_METRICS)
+        self.periods = dict(periods or PERIODS)
+        self._dists: dict[tuple[str, tuple, str, str], _Distribution] = {}
+        self._membership: dict[tuple[str, str], tuple] = {}
+        self._user_values: dict[str, dict[tuple[str, str], float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> int:
+        """Trailing days a user's rows must cover for every period."""
+        return max(self.periods.values())
+
+    def ingest(self, df: pd.DataFrame) -> int:
+        """
+        Fold per-user unified rows into the index; returns how many users were indexed.
+
+        Call once per ingested batch: every user in `df` is re-indexed from its
+        own rows, and users absent from the batch are left untouched.
+        """
+        if df.empty or "user_id" not in df.columns:
+            return 0
+
+        window = self.window
+        d = df.copy()
+        d["date"] = pd.to_datetime(d["date"])
+        d = d.sort_values("date")
+
+        # summarize outside the lock so concurrent lookups only wait on the swap
+        batch = [
+            (user_id, self._user_values_from(g.tail(window)), self._cohort_keys(g.tail(window)))
+            for user_id, g in d.groupby(d["user_id"].astype(str))
+        ]
+        with self._lock:
+            for user_id, values, keys in batch:
+                self._reindex_user(user_id, values, keys)
+        return len(batch)
+
+    def lookup(
+        self,
+        user_id: str,
+        metric: str,
+        period: str,
+        cohort: str = "all",
+        value: float | None = None,
+    ) -> dict | None:
+        """Percentile and z-score of `value` (default: the user's own indexed value) in their cohort."""
+        with self._lock:
+            if value is None:
+                value = self._user_values.get(user_id, {}).get((metric, period))
+            key = self._membership.get((cohort, user_id))
+            if value is None or key is None:
+                return None
+            dist = self._dists.get((cohort, key, metric, period))
+            if dist is None or not dist.values:
+                return None
+            out = dist.rank(value)
+        out.update({"cohort": cohort, "metric": metric, "period": period, "value": value})
+        return out
+
+    def user_summary(self, user_id: str, cohort: str = "all", min_size: int = MIN_COHORT_SIZE) -> dict:
+        """Every indexed metric/period for one user; ranks are withheld below `min_size`."""
+        metrics: dict[str, dict] = {}
+        size = 0
+        for m in self.metrics:
+            for p in self.periods:
+                r = self.lookup(user_id, m, p, cohort=cohort)
+                if r is None:
+                    continue
+                size = max(size, r["cohort_size"])
+                if r["cohort_size"] < min_size:
+                    r["percentile"] = None
+                    r["z"] = None
+                metrics.setdefault(m, {})[p] = {
+                    "value": round(r["value"], 2),
+                    "percentile": None if r["percentile"] is None else round(r["percentile"], 1),
+                    "z": None if r["z"] is None else round(r["z"], 2),
+                }
+        return {"cohort": cohort, "cohort_size": size, "sufficient": size >= min_size, "metrics": metrics}
+
+    def cohort_columns(self) -> list[str]:
+        return sorted({c for cols in self.cohorts.values() for c in cols})
+
+    def _user_values_from(self, tail: pd.DataFrame) -> dict[tuple[str, str], float]:
+        values: dict[tuple[str, str], float] = {}
+        for m in self.metrics:
+            if m not in tail.columns:
+                continue
+            series = pd.to_numeric(tail[m], errors="coerce")
+            for p, days in self.periods.items():
+                v = series.tail(days).dropna()
+                if not v.empty:
+                    values[(m, p)] = float(v.mean())
+        return values
+
+    def _cohort_keys(self, tail: pd.DataFrame) -> dict[str, tuple]:
+        return {
+            name: tuple(
+                str(tail[c].dropna().iloc[-1]) if c in tail.columns and tail[c].notna().any() else None
+                for c in cols
+            )
+            for name, cols in self.cohorts.items()
+        }
+
+    def _reindex_user(self, user_id: str, values: dict[tuple[str, str], float], keys: dict[str, tuple]) -> None:
+        for name, key in keys.items():
+            old_key = self._membership.get((name, user_id))
+            if old_key is not None:
+                for m in self.metrics:
+                    for p in self.periods:
+                        dist = self._dists.get((name, old_key, m, p))
+                        if dist is not None:
+                            dist.remove(user_id)
+            self._membership[(name, user_id)] = key
+            for (m, p), v in values.items():
+                self._dists.setdefault((name, key, m, p), _Distribution()).put(user_id, v)
+
+        self._user_values[user_id] = values
+
+
+# process-wide index, fed by ServiceRegistry.index_cohorts() with each ingested batch
+COHORT_INDEX = CohortIndex(cohorts=load_cohort_config())
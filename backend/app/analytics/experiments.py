@@ -0,0 +1,271 @@
+from __future__ import annotations
+import warnings
+import numpy as np
+import pandas as pd
+
+# kind -> (condition metric, outcome metric, default outcome lag in days)
+EXPERIMENT_KINDS: dict[str, tuple[str, str, int]] = {
+    "sleep_to_sugar": ("sleep_hours", "sugar_g", 1),
+    "sleep_to_steps": ("sleep_hours", "steps", 1),
+    "sleep_to_hr": ("sleep_hours", "resting_hr", 1),
+    "generic": ("sleep_hours", "sleep_hours", 0),
+}
+
+OUTCOME_LABELS = {
+    "sugar_g": "sugar",
+    "steps": "steps",
+    "resting_hr": "resting HR",
+    "sleep_hours": "sleep",
+}
+
+SLEEP_THRESHOLD_H = 6
+
+# cap on resampled values held in memory at once (experiments x boots x window)
+_BOOT_CHUNK_CELLS = 4_000_000
+
+# cap on total resampled values per request (~150 ms of bootstrap work)
+MAX_BOOTSTRAP_CELLS = 5_000_000
+
+# fewest resamples per experiment that still give a usable interval
+MIN_BOOTSTRAP = 100
+
+
+class _Panel:
+    """
+    All users' series concatenated end-to-end, with per-metric prefix sums.
+
+    Any window [start, end) that stays inside one user's segment can be summed
+    in O(1), so thousands of experiments cost a handful of vectorized lookups.
+    """
+
+    def __init__(self, df: pd.DataFrame, metrics: list[str]) -> None:
+        d = df.copy()
+        if "user_id" not in d.columns:
+            d["user_id"] = "demo_user"
+        d["user_id"] = d["user_id"].astype(str)
+        d["date"] = pd.to_datetime(d["date"])
+        d = d.sort_values(["user_id", "date"], kind="stable").reset_index(drop=True)
+
+        users = d["user_id"].to_numpy()
+        bounds = np.flatnonzero(np.r_[True, users[1:] != users[:-1], True]) if len(d) else np.array([0])
+        self.user_offset = {str(users[b]): (int(b), int(e)) for b, e in zip(bounds[:-1], bounds[1:])}
+        self.dates = d["date"].dt.date.astype(str).to_numpy()
+
+        self.csum: dict[str, np.ndarray] = {}
+        self.ccount: dict[str, np.ndarray] = {}
+        self.finite: dict[str, np.ndarray] = {}
+        for m in metrics:
+            if m in d.columns:
+                v = pd.to_numeric(d[m], errors="coerce").to_numpy(dtype=float)
+            else:
+                v = np.full(len(d), np.nan)
+            ok = np.isfinite(v)
+            self.csum[m] = np.r_[0.0, np.cumsum(np.where(ok, v, 0.0))]
+            self.ccount[m] = np.r_[0, np.cumsum(ok)]
+            # compacted finite values; window [s, e) maps to finite[ccount[s]:ccount[e]]
+            self.finite[m] = v[ok]
+
+    def window_stats(self, metric: str, start: np.ndarray, end: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        cs, cc = self.csum[metric], self.ccount[metric]
+        n = cc[end] - cc[start]
+        s = cs[end] - cs[start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, s / np.maximum(n, 1), np.nan)
+        return mean, n
+
+
+def _bootstrap_means(
+    panel: _Panel,
+    metric: str,
+    start: np.ndarray,
+    end: np.ndarray,
+    n_boot: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Resample each window's finite values with replacement; returns (E, n_boot) means."""
+    first = panel.ccount[metric][start]
+    n = panel.ccount[metric][end] - first
+    out = np.full((len(start), n_boot), np.nan)
+
+    # sort by window size so each chunk only pads to its own widest window
+    order = np.argsort(n, kind="stable")
+    order = order[n[order] > 0]
+    if order.size == 0:
+        return out
+    step = max(1, _BOOT_CHUNK_CELLS // (n_boot * int(n[order[-1]])))
+    for c in range(0, len(order), step):
+        rows = order[c:c + step]
+        f, k = first[rows], n[rows]
+        width = int(k.max())
+        u = rng.random((len(rows), n_boot, width))
+        idx = f[:, None, None] + np.floor(u * k[:, None, None]).astype(np.int64)
+        mask = np.arange(width)[None, None, :] < k[:, None, None]
+        vals = panel.finite[metric][np.where(mask, idx, 0)]
+        out[rows] = (vals * mask).sum(axis=2) / k[:, None]
+    return out
+
+
+def _pct_change(base: np.ndarray, exp: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(np.isfinite(base) & (base != 0), (exp - base) / base * 100.0, 0.0)
+
+
+def bootstrap_cells(experiments: list[dict], n_boot: int) -> int:
+    """Upper bound on values resampled by `evaluate_experiments` for this batch."""
+    days = sum(int(e.get("baseline_days", 30)) + int(e.get("duration_days", 7)) for e in experiments)
+    return days * n_boot
+
+
+def fit_bootstrap(experiments: list[dict], n_boot: int) -> int:
+    """Largest resample count <= `n_boot` that keeps the batch within MAX_BOOTSTRAP_CELLS."""
+    days = bootstrap_cells(experiments, 1)
+    return min(n_boot, MAX_BOOTSTRAP_CELLS // max(days, 1))
+
+
+def _lag_phrase(lag_days: int) -> str:
+    if lag_days == 0:
+        return "same day"
+    if lag_days == 1:
+        return "next day"
+    return f"{lag_days} days later"
+
+
+def _opt(x: float, ndigits: int = 3):
+    return None if not np.isfinite(x) else round(float(x), ndigits)
+
+
+def evaluate_experiments(
+    df: pd.DataFrame,
+    experiments: list[dict],
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 42,
+) -> list[dict]:
+    """
+    Evaluate many experiments across many users in one pass.
+
+    Each experiment is a dict with `kind`, `start_date`, `baseline_days`,
+    `duration_days` and optional `id`, `user_id` and `lag_days`. Window rules
+    mirror the client-side engine: the experiment window starts at
+    `start_date` (or the last `duration_days` if the date is missing), the
+    baseline is the `baseline_days` immediately before it, and the outcome
+    metric is read `lag_days` later than the condition metric.
+    """
+    if not experiments:
+        return []
+
+    metrics = sorted({m for c, o, _ in EXPERIMENT_KINDS.values() for m in (c, o)})
+    panel = _Panel(df, metrics)
+
+    E = len(experiments)
+    seg_lo = np.zeros(E, dtype=np.int64)
+    seg_hi = np.zeros(E, dtype=np.int64)
+    start = np.zeros(E, dtype=np.int64)
+    duration = np.zeros(E, dtype=np.int64)
+    baseline = np.zeros(E, dtype=np.int64)
+    lag = np.zeros(E, dtype=np.int64)
+    known = np.zeros(E, dtype=bool)
+    kinds: list[str] = []
+
+    for i, exp in enumerate(experiments):
+        kind = exp.get("kind", "generic")
+        kind = kind if kind in EXPERIMENT_KINDS else "generic"
+        kinds.append(kind)
+        duration[i] = int(exp.get("duration_days", 7))
+        baseline[i] = int(exp.get("baseline_days", 30))
+        lag_days = exp.get("lag_days")
+        lag[i] = EXPERIMENT_KINDS[kind][2] if lag_days is None else int(lag_days)
+
+        seg = panel.user_offset.get(str(exp.get("user_id", "demo_user")))
+        if seg is None:
+            continue
+        known[i] = True
+        lo, hi = seg
+        seg_lo[i], seg_hi[i] = lo, hi
+        hits = np.flatnonzero(panel.dates[lo:hi] == str(exp.get("start_date")))
+        start[i] = lo + hits[0] if hits.size else max(lo, hi - duration[i])
+
+    # windows are global indices clamped to each user's segment
+    exp_s = np.clip(start, seg_lo, seg_hi)
+    exp_e = np.clip(exp_s + duration, exp_s, seg_hi)
+    base_e = exp_s
+    base_s = np.clip(base_e - baseline, seg_lo, base_e)
+
+    def lagged(s: np.ndarray, e: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        ls = np.clip(s + lag, seg_lo, seg_hi)
+        return ls, np.clip(e + lag, ls, seg_hi)
+
+    base_ls, base_le = lagged(base_s, base_e)
+    exp_ls, exp_le = lagged(exp_s, exp_e)
+
+    done = np.clip(seg_hi - exp_s, 0, duration)
+    base_val = np.full(E, np.nan)
+    exp_val = np.full(E, np.nan)
+    ci_lo = np.full(E, np.nan)
+    ci_hi = np.full(E, np.nan)
+    exp_sleep, _ = panel.window_stats("sleep_hours", exp_s, exp_e)
+
+    rng = np.random.default_rng(seed)
+    alpha = (1.0 - confidence) / 2.0
+    kind_arr = np.array(kinds)
+    for kind, (_, outcome, _) in EXPERIMENT_KINDS.items():
+        sel = np.flatnonzero((kind_arr == kind) & known)
+        if sel.size == 0:
+            continue
+        base_val[sel], _ = panel.window_stats(outcome, base_ls[sel], base_le[sel])
+        exp_val[sel], _ = panel.window_stats(outcome, exp_ls[sel], exp_le[sel])
+        if n_boot > 0:
+            bb = _bootstrap_means(panel, outcome, base_ls[sel], base_le[sel], n_boot, rng)
+            be = _bootstrap_means(panel, outcome, exp_ls[sel], exp_le[sel], n_boot, rng)
+            boot_pct = _pct_change(bb, be)
+            boot_pct = np.where(np.isfinite(bb) & np.isfinite(be), boot_pct, np.nan)
+            with warnings.catch_warnings():
+                # windows with no data yield all-NaN rows; their CI stays None
+                warnings.simplefilter("ignore", RuntimeWarning)
+                q = np.nanquantile(boot_pct, [alpha, 1.0 - alpha], axis=1)
+            ci_lo[sel], ci_hi[sel] = q[0], q[1]
+
+    # a missing window (e.g. the lagged outcome of a just-started experiment) has no result yet
+    pct = np.where(np.isfinite(base_val) & np.isfinite(exp_val), _pct_change(base_val, exp_val), np.nan)
+
+    out = []
+    for i, exp in enumerate(experiments):
+        kind = kinds[i]
+        outcome = EXPERIMENT_KINDS[kind][1]
+        d = int(duration[i])
+        p = float(pct[i])
+        has_result = bool(known[i] and np.isfinite(p) and (kind == "generic" or np.isfinite(exp_sleep[i])))
+        sign = "+" if p >= 0 else ""
+        if not has_result:
+            rubric = "Not enough data yet."
+        elif kind == "generic":
+            rubric = f"Sleep change → {sign}{p:.0f}% sleep vs {int(baseline[i])}d baseline"
+        else:
+            left = f"<{SLEEP_THRESHOLD_H}h sleep" if exp_sleep[i] < SLEEP_THRESHOLD_H else f"≥{SLEEP_THRESHOLD_H}h sleep"
+            rubric = (
+                f"{left} → {sign}{p:.0f}% {OUTCOME_LABELS[outcome]} {_lag_phrase(int(lag[i]))} "
+                f"(vs {int(baseline[i])}d baseline)"
+            )
+
+        out.append({
+            "id": exp.get("id"),
+            "user_id": str(exp.get("user_id", "demo_user")),
+            "kind": kind,
+            "outcome": outcome,
+            "ready": bool(has_result and done[i] >= 2),
+            "done_days": int(done[i]),
+            "is_complete": bool(known[i] and done[i] >= d),
+            "progress_label": f"{int(done[i])}/{d} days",
+            "rubric_sentence": rubric,
+            "details": {
+                "baseline_label": f"{int(baseline[i])}d baseline",
+                "baseline_value": _opt(base_val[i]),
+                "experiment_value": _opt(exp_val[i]),
+                "change_pct": round(p, 2) if has_result else None,
+                "change_pct_ci": [_opt(ci_lo[i], 2), _opt(ci_hi[i], 2)] if n_boot > 0 else None,
+                "confidence": confidence,
+                "avg_sleep_in_experiment": _opt(exp_sleep[i]),
+                "lag_days": int(lag[i]),
+            },
+        })
+    return out
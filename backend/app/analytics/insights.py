@@ -2,8 +2,13 @@ from __future__ import annotations
 import pandas as pd
 from app.analytics.correlations import compute_correlations
 from app.analytics.anomalies import rolling_z_anomalies
+from app.analytics.cohorts import CohortIndex, MIN_COHORT_SIZE
 
-def build_insights(df: pd.DataFrame) -> list[dict]:
+def build_insights(
+    df: pd.DataFrame,
+    cohort_index: CohortIndex | None = None,
+    user_id: str = "demo_user",
+) -> list[dict]:
     # Pick a small set of pairs 
     pairs = [
         ("sleep_hours", "sugar_g"),
@@ -52,8 +57,34 @@ def build_insights(df: pd.DataFrame) -> list[dict]:
             "responsible_note": "This is not medical advice; anomalies can have benign causes.",
         })
 
+    if cohort_index is not None:
+        cards += cohort_cards(user_id, cohort_index)
+
     return cards
 
+def cohort_cards(user_id: str, index: CohortIndex, period: str = "30d") -> list[dict]:
+    cards = []
+    for metric in ["sleep_hours", "steps"]:
+        r = index.lookup(user_id, metric, period)
+        if r is None or r["cohort_size"] < MIN_COHORT_SIZE or r["percentile"] is None:
+            continue
+        pct = r["percentile"]
+        if 20 < pct < 80:
+            continue
+        cards.append({
+            "id": f"cohort:{r['cohort']}:{metric}:{period}",
+            "type": "cohort",
+            "title": f"{pretty(metric)} vs your cohort",
+            "summary": f"Your {period} average {pretty(metric).lower()} is in the {ordinal(round(pct))} percentile of your cohort.",
+            "evidence": r,
+            "responsible_note": "Cohort comparisons describe typical ranges, not health targets.",
+        })
+    return cards[:1]
+
+def ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
 def correlation_title(c: dict) -> str:
     base = f"{pretty(c['x'])} ↔ {pretty(c['y'].replace('_lag',''))}"
     if c["lag_days"] == 1:
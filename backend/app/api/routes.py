@@ -1,8 +1,13 @@
 # backend/app/api/routes.py
-from fastapi import APIRouter, Depends, Query
+from typing import List, Literal, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app.analytics.cohorts import COHORT_INDEX, CohortMetric, CohortPeriod
+from app.analytics.experiments import MIN_BOOTSTRAP, evaluate_experiments, fit_bootstrap
 from app.analytics.insights import build_insights
-from app.data.generate_demo_data import ensure_demo_data
+from app.data.generate_demo_data import DATA_PATH, ensure_demo_data
 from app.services.registry import ServiceRegistry
 
 router = APIRouter()
@@ -13,18 +18,25 @@ def get_registry() -> ServiceRegistry:
 
 
 @router.post("/demo/seed")
-def seed_demo(days: int = Query(default=90, ge=14, le=365)) -> dict:
+def seed_demo(
+    days: int = Query(default=90, ge=14, le=365),
+    registry: ServiceRegistry = Depends(get_registry),
+) -> dict:
+    fresh = not DATA_PATH.exists()
     path = ensure_demo_data(days=days)
-    return {"ok": True, "data_path": str(path)}
+    # only a newly generated file is a new batch; existing data was indexed at startup
+    indexed = registry.index_cohorts(registry.read_raw()) if fresh else 0
+    return {"ok": True, "data_path": str(path), "cohort_users_indexed": indexed}
 
 
 @router.get("/dashboard/summary")
 def dashboard_summary(
     range_days: int = Query(default=30, ge=7, le=180),
+    user_id: str = Query(default="demo_user"),
     registry: ServiceRegistry = Depends(get_registry),
 ) -> dict:
     df = registry.load_unified(range_days=range_days)
-    return registry.kpi_summary(df)
+    return registry.kpi_summary(df, user_id=user_id)
 
 
 @router.get("/dashboard/timeseries")
@@ -39,13 +51,73 @@ def dashboard_timeseries(
 @router.get("/insights")
 def get_insights(
     range_days: int = Query(default=30, ge=7, le=180),
+    user_id: str = Query(default="demo_user"),
     registry: ServiceRegistry = Depends(get_registry),
 ) -> dict:
     df = registry.load_unified(range_days=range_days)
-    cards = build_insights(df)
+    cards = build_insights(df, cohort_index=COHORT_INDEX, user_id=user_id)
     return {"insights": cards}
 
 
+class ExperimentSpec(BaseModel):
+    id: Optional[str] = None
+    user_id: str = "demo_user"
+    kind: Literal["sleep_to_sugar", "sleep_to_steps", "sleep_to_hr", "generic"] = "generic"
+    start_date: str
+    baseline_days: int = Field(default=30, ge=1, le=365)
+    duration_days: int = Field(default=7, ge=1, le=90)
+    lag_days: Optional[int] = Field(default=None, ge=0, le=14)
+
+
+class ExperimentBatch(BaseModel):
+    experiments: List[ExperimentSpec] = Field(default_factory=list, max_length=1000)
+    bootstrap: int = Field(default=1000, ge=0, le=2000)
+    confidence: float = Field(default=0.95, gt=0.5, lt=1.0)
+
+
+@router.post("/experiments/evaluate")
+def experiments_evaluate(
+    batch: ExperimentBatch,
+    range_days: int = Query(default=120, ge=7, le=365),
+    registry: ServiceRegistry = Depends(get_registry),
+) -> dict:
+    experiments = [e.model_dump() for e in batch.experiments]
+    # large batches get fewer resamples rather than an unbounded amount of work
+    n_boot = fit_bootstrap(experiments, batch.bootstrap)
+    if batch.bootstrap > 0 and n_boot < MIN_BOOTSTRAP:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Batch too large: only {n_boot} bootstrap samples would fit (min {MIN_BOOTSTRAP}). "
+            "Send fewer experiments or shorter windows.",
+        )
+
+    # per-user frames: the dashboard's load_unified merges every user into one row per date
+    users = {e["user_id"] for e in experiments}
+    df = registry.unify_by_user(registry.read_raw(), days=range_days, users=users)
+    results = evaluate_experiments(
+        df,
+        experiments,
+        n_boot=n_boot,
+        confidence=batch.confidence,
+    )
+    return {"results": results, "bootstrap": n_boot}
+
+
+@router.get("/cohort/percentile")
+def cohort_percentile(
+    metric: CohortMetric = Query(default="sleep_hours"),
+    period: CohortPeriod = Query(default="30d"),
+    cohort: str = Query(default="all"),
+    user_id: str = Query(default="demo_user"),
+) -> dict:
+    if cohort not in COHORT_INDEX.cohorts:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown cohort {cohort!r}; configured: {sorted(COHORT_INDEX.cohorts)}",
+        )
+    return {"result": COHORT_INDEX.lookup(user_id, metric, period, cohort=cohort)}
+
+
 @router.get("/sources/status")
 def sources_status(
     range_days: int = Query(default=30, ge=7, le=180),
@@ -126,55 +126,24 @@ def merge_by_date(records_by_source: Dict[str, List[NormalizedDailyRecord]]) ->
         "resting_hr",
     ]
 
-    def pick_for_date(day: pd.DataFrame) -> Dict[str, Any]:
-        day = day.copy()
-
-        present_sources = sorted(
-            set(day["_source"].tolist()),
-            key=lambda s: PRIORITY.index(s) if s in PRIORITY else 999,
-        )
-
-        user_id_series = day["user_id"].dropna()
-        user_id = str(user_id_series.iloc[0]) if not user_id_series.empty else "demo_user"
-
-        sync_vals = [v for v in day["last_sync_iso"].dropna().tolist()]
-        last_sync_iso = max(sync_vals) if sync_vals else _now_iso()
-
-        out: Dict[str, Any] = {
-            "date": day["date"].iloc[0],
-            "user_id": user_id,
-            "sources_used": present_sources,
-            "last_sync_iso": last_sync_iso,
-        }
-
-        for m in metric_cols:
-            val = None
-            chosen_src = None
-
-            for src in PRIORITY:
-                rows = day[day["_source"] == src]
-                if rows.empty or m not in rows.columns:
-                    continue
-                candidate = rows[m].dropna()
-                if not candidate.empty:
-                    val = candidate.iloc[0]
-                    chosen_src = src
-                    break
-
-            if val is None and m in day.columns:
-                candidate = day[m].dropna()
-                if not candidate.empty:
-                    idx = candidate.index[0]
-                    val = candidate.iloc[0]
-                    chosen_src = str(day.loc[idx, "_source"])
-
-            out[m] = val
-            out[f"{m}__source"] = chosen_src
-
-        return out
-
-    merged_rows = [pick_for_date(group) for _, group in dfa.groupby("date")]
-    dfu = pd.DataFrame(merged_rows).sort_values("date")
+    # rank rows by source priority (unknown sources last, in arrival order) so the
+    # first non-null value per date is the winner for every metric at once
+    dfa["_rank"] = dfa["_source"].map({s: i for i, s in enumerate(PRIORITY)}).fillna(999)
+    dfa["_pos"] = range(len(dfa))
+    ranked = dfa.sort_values(["date", "_rank", "_pos"], kind="stable")
+    by_date = ranked.groupby("date", sort=True)
+
+    dfu = pd.DataFrame({"date": sorted(dfa["date"].unique())}).set_index("date", drop=False)
+    dfu["user_id"] = dfa.groupby("date")["user_id"].first().fillna("demo_user").astype(str)
+    dfu["sources_used"] = by_date["_source"].agg(lambda s: list(dict.fromkeys(s)))
+    dfu["last_sync_iso"] = by_date["last_sync_iso"].max().fillna(_now_iso())
+
+    for m in metric_cols:
+        has = ranked[ranked[m].notna()].groupby("date").head(1).set_index("date")
+        dfu[m] = has[m].reindex(dfu.index)
+        dfu[f"{m}__source"] = has["_source"].reindex(dfu.index).astype(object).where(lambda v: v.notna(), None)
+
+    dfu = dfu.reset_index(drop=True).infer_objects().sort_values("date")
 
     meta = build_sources_status(dfu, records_by_source)
     return dfu, meta
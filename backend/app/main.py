@@ -1,9 +1,23 @@
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import routes
+from app.services.registry import ServiceRegistry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # build the cohort index once from existing data without holding up startup;
+    # lookups return no rank until it lands, later batches arrive via /v1/demo/seed
+    registry = ServiceRegistry()
+    threading.Thread(target=lambda: registry.index_cohorts(registry.read_raw()), daemon=True).start()
+    yield
+
 
-app = FastAPI(title="Wellness Aggregator API", version="0.1.0")
+app = FastAPI(title="Wellness Aggregator API", version="0.1.0", lifespan=lifespan)
 
 # Allow local frontend dev server to call backend
 app.add_middleware(
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import pandas as pd
+from app.analytics.cohorts import COHORT_INDEX
 from app.data.generate_demo_data import ensure_demo_data
 from app.data.unify import (
     ingest_apple_health,
@@ -38,6 +39,61 @@ class ServiceRegistry:
         df["date"] = pd.to_datetime(df["date"])
         df = df.sort_values("date").tail(max(range_days, 30)).copy()
 
+        unified, meta = self._unify(df)
+        self._last_meta = meta
+
+        # apply requested window after merge
+        unified = unified.sort_values("date").tail(range_days).copy()
+        return unified
+
+    def read_raw(self) -> pd.DataFrame:
+        df = pd.read_csv(ensure_demo_data())
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def unify_by_user(
+        self,
+        df: pd.DataFrame,
+        days: int,
+        users: set[str] | None = None,
+        keep_cols: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Unify each user's last `days` raw rows on their own and stack the results.
+
+        Unlike load_unified, users never share a date row, so the frame is safe
+        for cross-user analytics. `users` limits the work to those ids and
+        `keep_cols` carries raw columns (latest value per user) through the merge.
+        """
+        if df.empty or "user_id" not in df.columns:
+            return pd.DataFrame()
+        df = df.copy()
+        df["date"] = pd.to_datetime(df["date"])
+        df["user_id"] = df["user_id"].astype(str)
+        if users is not None:
+            df = df[df["user_id"].isin(users)]
+
+        frames = []
+        for _, g in df.groupby("user_id"):
+            g = g.sort_values("date").tail(days)
+            unified, _ = self._unify(g)
+            for c in keep_cols or []:
+                if c in g.columns and g[c].notna().any():
+                    unified[c] = g[c].dropna().iloc[-1]
+            frames.append(unified)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def index_cohorts(self, df: pd.DataFrame) -> int:
+        """
+        Fold a batch of new or changed raw daily rows into the cohort index.
+
+        Only users present in the batch are re-indexed, each from just the
+        trailing rows the index's longest period needs.
+        """
+        unified = self.unify_by_user(df, days=COHORT_INDEX.window, keep_cols=COHORT_INDEX.cohort_columns())
+        return COHORT_INDEX.ingest(unified)
+
+    def _unify(self, df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
         # Mock disparate sources 
         apple = df[["date","user_id","sleep_hours","steps","active_minutes","resting_hr"]].copy()
 
@@ -56,17 +112,12 @@ class ServiceRegistry:
             "MyFitnessPal": ingest_myfitnesspal(mfp),
         }
 
-        unified, meta = merge_by_date(records_by_source)
-        self._last_meta = meta
-
-        # apply requested window after merge
-        unified = unified.sort_values("date").tail(range_days).copy()
-        return unified
+        return merge_by_date(records_by_source)
 
     def sources_status(self) -> dict:
         return self._last_meta or {"sources": {}, "coverage": {}, "last_sync_iso": None}
 
-    def kpi_summary(self, df: pd.DataFrame) -> dict:
+    def kpi_summary(self, df: pd.DataFrame, user_id: str = "demo_user") -> dict:
         def safe_mean(col: str, ndigits: int = 2):
             if col not in df.columns:
                 return None
@@ -88,8 +139,12 @@ class ServiceRegistry:
             "avg_steps": safe_int_mean("steps"),
             "avg_calories": safe_int_mean("calories"),
             "avg_sugar_g": safe_mean("sugar_g", 1),
+            "cohort": self.cohort_summary(user_id),
         }
 
+    def cohort_summary(self, user_id: str = "demo_user", cohort: str = "all") -> dict:
+        return COHORT_INDEX.user_summary(user_id, cohort=cohort)
+
     def to_timeseries(self, df: pd.DataFrame) -> dict:
         def col_list(c: str):
             if c not in df.columns: